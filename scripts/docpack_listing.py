@@ -0,0 +1,590 @@
+"""
+Shared listing pipeline for the docpack scripts.
+
+Lists the docpacks in the R2/S3 bucket and reads each one's manifest.json
+without downloading whole archives, caching manifests on disk and in memory.
+"""
+
+import asyncio
+import random
+import sqlite3
+import struct
+import sys
+import zlib
+import httpx
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from urllib.parse import quote
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+from botocore.auth import S3SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+from stream_unzip import async_stream_unzip
+import os
+
+# Load environment variables from website/.env
+env_path = Path(__file__).parent.parent / "website" / ".env"
+load_dotenv(env_path)
+
+# Get credentials from environment
+BUCKET_NAME = os.getenv("BUCKET_NAME", "doctown-central")
+ACCESS_KEY_ID = os.getenv("BUCKET_ACCESS_KEY_ID")
+SECRET_ACCESS_KEY = os.getenv("BUCKET_SECRET_ACCESS_KEY")
+ENDPOINT_URL = os.getenv("BUCKET_S3_ENDPOINT")
+
+# Maximum number of manifest downloads in flight at once
+MAX_CONCURRENCY = 64
+
+# Keys requested per ListObjectsV2 call (the S3 maximum). Buckets with more
+# docpacks than fit in one page are listed one subdirectory at a time, in parallel.
+LIST_PAGE_SIZE = 1000
+LIST_CONCURRENCY = 8
+
+# Object GETs bypass botocore's retry logic, so throttling (429) and server
+# errors are retried here with jittered exponential backoff
+GET_ATTEMPTS = 5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_BASE_DELAY = 0.2
+RETRY_MAX_DELAY = 10
+
+
+def check_credentials():
+    """Raise RuntimeError if the bucket credentials are not configured"""
+    if not all([ACCESS_KEY_ID, SECRET_ACCESS_KEY, ENDPOINT_URL]):
+        raise RuntimeError("Missing bucket credentials in website/.env")
+
+
+def create_s3_client(s3_select=False):
+    """Create an async S3 client for listing, to be entered with `async with`
+
+    With s3_select every manifest worker also queries through this client, so
+    the pool is sized for them rather than just for the listings.
+    """
+    check_credentials()
+    return get_session().create_client(
+        "s3",
+        endpoint_url=ENDPOINT_URL,
+        aws_access_key_id=ACCESS_KEY_ID,
+        aws_secret_access_key=SECRET_ACCESS_KEY,
+        config=AioConfig(
+            signature_version="s3v4",
+            # Enough pooled keep-alive connections for every concurrent request
+            max_pool_connections=MAX_CONCURRENCY if s3_select else LIST_CONCURRENCY,
+            tcp_keepalive=True,
+            retries={"max_attempts": 5, "mode": "adaptive"},
+            connect_timeout=5,
+            read_timeout=30,
+        ),
+        region_name="auto",
+    )
+
+
+def create_http_client():
+    """Create an HTTP/2 client for object GETs, to be entered with `async with`
+
+    HTTP/2 multiplexes every in-flight GET over a handful of connections, so
+    the TLS handshake is paid once rather than per docpack.
+    """
+    check_credentials()
+    limits = httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY)
+    return httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(http2=True, limits=limits, retries=3),
+        timeout=httpx.Timeout(30, connect=5),
+    )
+
+
+def signed_object_request(bucket, key, byte_range=None):
+    """Build a SigV4-signed GET for an object, returning (url, headers)"""
+    url = f"{ENDPOINT_URL}/{bucket}/{quote(key)}"
+    request = AWSRequest(method="GET", url=url, headers={"Range": f"bytes={byte_range}"} if byte_range else {})
+    S3SigV4Auth(Credentials(ACCESS_KEY_ID, SECRET_ACCESS_KEY), "s3", "auto").add_auth(request)
+    return url, dict(request.headers.items())
+
+
+# Manifests are cached on disk and reused while the object's ETag is unchanged.
+# New rows are written in batches as they arrive rather than held until the end,
+# and rows for docpacks that are no longer listed are pruned after a full listing.
+MANIFEST_CACHE_PATH = Path.home() / ".cache" / "doctown" / "docpacks.db"
+CACHE_BATCH_SIZE = 256
+
+# Manifests read during this process, keyed by (bucket, key, etag), so a second
+# listing in the same process (e.g. from a wrapper running both scripts) is free
+MANIFEST_MEMO_SIZE = 4096
+_manifest_memo = OrderedDict()
+
+
+# Docpacks may have their manifest uploaded alongside them as <key>.manifest.json;
+# it is only used when it is at least as new as the docpack itself
+SIDECAR_SUFFIX = ".manifest.json"
+
+
+# With s3_select, sidecar manifests are filtered server-side so private ones never leave the bucket
+# (PUBLIC is a reserved word in S3 Select SQL, so the field name is quoted)
+PUBLIC_SELECT_EXPRESSION = 'SELECT * FROM S3Object s WHERE s."public" = TRUE'
+
+# Error codes meaning the store doesn't implement S3 Select at all
+SELECT_UNSUPPORTED_CODES = {"NotImplemented", "MethodNotAllowed"}
+
+
+# ZIP record signatures and fixed-size header layouts, compiled once up front
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+EOCD_SIGNATURE = b"PK\x05\x06"
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<4sHHHHHHIIIHHHHHII")
+EOCD = struct.Struct("<4sHHHHIIH")
+LOCAL_HEADER_SIZE = LOCAL_HEADER.size
+CENTRAL_HEADER_SIZE = CENTRAL_HEADER.size
+EOCD_SIZE = EOCD.size
+
+# The end-of-central-directory record is followed by at most a 64KB comment,
+# so the archive tail always contains it
+TAIL_FETCH_SIZE = EOCD_SIZE + 65535
+
+# Chunk size used when streaming a whole archive, and how much of it is
+# buffered while walking local headers before handing over to stream_unzip
+STREAM_CHUNK_SIZE = 65536
+LOCAL_SCAN_LIMIT = 4 * 1024 * 1024
+
+# General purpose flag bit meaning sizes follow the data in a data descriptor
+DATA_DESCRIPTOR_FLAG = 0x08
+
+
+@asynccontextmanager
+async def signed_get(http_client, bucket, key, byte_range=None):
+    """Send a signed GET for an object, retrying throttling and server errors
+
+    Yields the response with its body unread; it is closed on exit. The last
+    attempt's response is yielded even if it still failed, so callers check
+    the status as usual.
+    """
+    for attempt in range(GET_ATTEMPTS):
+        # Signed afresh on every attempt so the request timestamp stays current
+        url, headers = signed_object_request(bucket, key, byte_range)
+        last_attempt = attempt == GET_ATTEMPTS - 1
+        try:
+            response = await http_client.send(http_client.build_request("GET", url, headers=headers), stream=True)
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                break
+            await response.aclose()
+        await asyncio.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
+
+    try:
+        yield response
+    finally:
+        await response.aclose()
+
+
+def range_start(response):
+    """Offset of a GET response body within the object"""
+    # Content-Range looks like "bytes 100-199/200"; it is absent if the range was ignored
+    content_range = response.headers.get("Content-Range")
+    if not content_range:
+        return 0
+    return int(content_range.split()[1].split("-")[0])
+
+
+async def fetch_range(http_client, bucket, key, byte_range):
+    """Fetch a byte range of an object, returning (data, offset of data in the object)"""
+    async with signed_get(http_client, bucket, key, byte_range) as response:
+        response.raise_for_status()
+        return await response.aread(), range_start(response)
+
+
+async def stream_manifest_bytes(response):
+    """Stream a whole ZIP response, stopping as soon as manifest.json has been read
+
+    Local file headers are walked directly while the archive records sizes up
+    front; anything else is handed to stream_unzip. Returning early leaves the
+    rest of the body unread, and closing the response abandons the transfer.
+    """
+    chunks = response.aiter_bytes(STREAM_CHUNK_SIZE)
+    buffered = bytearray()
+
+    async def replay():
+        # Hand the scanned prefix to stream_unzip without keeping a second copy alive
+        head = bytes(buffered)
+        buffered.clear()
+        yield head
+        async for chunk in chunks:
+            yield chunk
+
+    try:
+        async for chunk in chunks:
+            buffered += chunk
+            member = find_local_member(buffered, b"manifest.json")
+            if member is not None:
+                return decompress_member(*member)
+            if len(buffered) > LOCAL_SCAN_LIMIT:
+                break
+        else:
+            return None
+    except KeyError:
+        return None
+    except ValueError:
+        pass
+
+    async for name, _, file_chunks in async_stream_unzip(replay()):
+        if name == b"manifest.json":
+            return b"".join([chunk async for chunk in file_chunks])
+        # Members must be drained before stream_unzip moves to the next one
+        async for _ in file_chunks:
+            pass
+    return None
+
+
+def find_central_directory_entry(central_directory, name):
+    """Return (compression, compressed size, local header offset) for a member, or None"""
+    pos = 0
+    while central_directory.startswith(CENTRAL_HEADER_SIGNATURE, pos):
+        (_, _, _, _, compression, _, _, _, compressed_size, _,
+         name_len, extra_len, comment_len, _, _, _, local_header_offset) = CENTRAL_HEADER.unpack_from(central_directory, pos)
+
+        name_start = pos + CENTRAL_HEADER_SIZE
+        if central_directory[name_start:name_start + name_len] == name:
+            return compression, compressed_size, local_header_offset
+
+        pos = name_start + name_len + extra_len + comment_len
+    return None
+
+
+def find_local_member(buffer, name):
+    """Walk local file headers from the start of a ZIP buffer looking for a member
+
+    Returns (compression, payload) once the member is fully buffered, or None if
+    more data is needed. Raises KeyError if the central directory is reached
+    first, and ValueError when the archive can't be walked this way, e.g. sizes
+    deferred to a data descriptor or ZIP64 entries.
+    """
+    pos = 0
+    while len(buffer) >= pos + LOCAL_HEADER_SIZE:
+        if buffer.startswith(CENTRAL_HEADER_SIGNATURE, pos):
+            raise KeyError(name)
+        if not buffer.startswith(LOCAL_HEADER_SIGNATURE, pos):
+            raise ValueError("Unexpected record between local file headers")
+        _, _, flags, compression, _, _, _, compressed_size, _, name_len, extra_len = LOCAL_HEADER.unpack_from(buffer, pos)
+        if flags & DATA_DESCRIPTOR_FLAG or compressed_size == 0xFFFFFFFF:
+            raise ValueError("Member sizes are not stored in the local header")
+
+        name_start = pos + LOCAL_HEADER_SIZE
+        data_start = name_start + name_len + extra_len
+        if len(buffer) < data_start:
+            return None
+        if buffer[name_start:name_start + name_len] == name:
+            if len(buffer) < data_start + compressed_size:
+                return None
+            return compression, buffer[data_start:data_start + compressed_size]
+
+        pos = data_start + compressed_size
+    return None
+
+
+def decompress_member(compression, payload):
+    """Decompress a stored or deflated ZIP member"""
+    if compression == 0:
+        return payload
+    if compression == 8:
+        return zlib.decompress(payload, -15)
+    raise ValueError(f"Unsupported compression method {compression} for manifest.json")
+
+
+async def read_manifest_bytes(http_client, bucket, key):
+    """Read manifest.json out of a remote ZIP using ranged GETs
+
+    Fetches the archive tail to locate the central directory, then just the
+    manifest's local header and payload. Falls back to streaming the archive
+    when ranges aren't honoured. Returns None if there is no manifest.
+    """
+    async with signed_get(http_client, bucket, key, f"-{TAIL_FETCH_SIZE}") as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            # The range was ignored and the whole archive is on its way, so stream it
+            return await stream_manifest_bytes(response)
+        tail, tail_start = await response.aread(), range_start(response)
+
+    async def read_span(start, length):
+        # Serve from the already-fetched tail when possible (small archives fit entirely)
+        if start >= tail_start and start + length <= tail_start + len(tail):
+            return tail[start - tail_start:start - tail_start + length]
+        data, _ = await fetch_range(http_client, bucket, key, f"{start}-{start + length - 1}")
+        return data
+
+    eocd = tail.rfind(EOCD_SIGNATURE)
+    if eocd < 0:
+        raise ValueError("End of central directory not found; not a ZIP archive")
+    _, _, _, _, _, cd_size, cd_offset, _ = EOCD.unpack_from(tail, eocd)
+    if cd_offset == 0xFFFFFFFF:
+        # ZIP64 archives keep their real offsets elsewhere; stream_unzip handles them
+        async with signed_get(http_client, bucket, key) as response:
+            response.raise_for_status()
+            return await stream_manifest_bytes(response)
+
+    entry = find_central_directory_entry(await read_span(cd_offset, cd_size), b"manifest.json")
+    if entry is None:
+        return None
+    compression, compressed_size, local_header_offset = entry
+
+    # Fetch the header and payload together, assuming the local extra field is no
+    # longer than 64 bytes; anything beyond that costs one more ranged read
+    span = await read_span(local_header_offset, LOCAL_HEADER_SIZE + len("manifest.json") + 64 + compressed_size)
+    if not span.startswith(LOCAL_HEADER_SIGNATURE):
+        raise ValueError("Corrupt local file header for manifest.json")
+    *_, name_len, extra_len = LOCAL_HEADER.unpack_from(span)
+    data_start = LOCAL_HEADER_SIZE + name_len + extra_len
+    payload = span[data_start:data_start + compressed_size]
+    if len(payload) < compressed_size:
+        payload = await read_span(local_header_offset + data_start, compressed_size)
+
+    return decompress_member(compression, payload)
+
+
+async def read_sidecar_manifest(http_client, bucket, key):
+    """Read the manifest uploaded alongside a docpack, or None if it is missing"""
+    async with signed_get(http_client, bucket, key + SIDECAR_SUFFIX) as response:
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return await response.aread()
+
+
+async def select_public_manifest(s3_client, bucket, key):
+    """Filter a docpack's sidecar manifest server-side with S3 Select
+
+    Returns the manifest bytes if the docpack is public, b"" if it is private,
+    or None if the store doesn't support the query (R2 does not implement S3
+    Select). Any other failure, e.g. a missing sidecar or throttling, is raised
+    for the caller to report against this docpack alone.
+    """
+    try:
+        response = await s3_client.select_object_content(
+            Bucket=bucket,
+            Key=key + SIDECAR_SUFFIX,
+            ExpressionType="SQL",
+            Expression=PUBLIC_SELECT_EXPRESSION,
+            InputSerialization={"JSON": {"Type": "DOCUMENT"}},
+            OutputSerialization={"JSON": {}},
+        )
+        records = [event["Records"]["Payload"] async for event in response["Payload"] if "Records" in event]
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in SELECT_UNSUPPORTED_CODES:
+            raise
+        print(f"Warning: S3 Select is not supported, falling back to GET: {e}", file=sys.stderr)
+        return None
+    return b"".join(records)
+
+
+async def extract_manifest_from_docpack(http_client, bucket, key, has_sidecar=False):
+    """Read the raw manifest.json bytes from a .docpack without downloading the whole archive
+
+    Returns None if the docpack has no manifest.
+    """
+    manifest_data = None
+    if has_sidecar:
+        manifest_data = await read_sidecar_manifest(http_client, bucket, key)
+    if manifest_data is None:
+        # Older docpacks have no sidecar, so read the manifest out of the archive
+        manifest_data = await read_manifest_bytes(http_client, bucket, key)
+    return manifest_data
+
+
+def open_manifest_cache():
+    """Open the on-disk manifest cache, creating it if needed"""
+    MANIFEST_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    cache = sqlite3.connect(MANIFEST_CACHE_PATH)
+    cache.execute(
+        "CREATE TABLE IF NOT EXISTS manifests ("
+        "bucket TEXT, key TEXT, etag TEXT, manifest BLOB, mtime TEXT, "
+        "PRIMARY KEY (bucket, key))"
+    )
+    # Keys seen by the current listing, used to prune rows for deleted docpacks
+    cache.execute("CREATE TEMP TABLE listed (key TEXT PRIMARY KEY)")
+    return cache
+
+
+def load_cached_manifest(cache, bucket, key, etag):
+    """Return a docpack's cached manifest JSON, or None if it is missing or its ETag changed"""
+    row = cache.execute(
+        "SELECT manifest FROM manifests WHERE bucket = ? AND key = ? AND etag = ?", (bucket, key, etag)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def prune_manifests(cache, bucket):
+    """Delete cached rows for docpacks in a bucket that the last listing didn't include"""
+    with cache:
+        cache.execute(
+            "DELETE FROM manifests WHERE bucket = ? AND key NOT IN (SELECT key FROM listed)", (bucket,)
+        )
+
+
+def store_manifests(cache, rows):
+    """Write (bucket, key, etag, manifest, mtime) rows to the cache in one transaction"""
+    with cache:
+        cache.executemany("INSERT OR REPLACE INTO manifests VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def remember_manifest(bucket, key, etag, manifest_data):
+    """Add a manifest to the in-process memo, evicting the least recently used"""
+    _manifest_memo[bucket, key, etag] = manifest_data
+    _manifest_memo.move_to_end((bucket, key, etag))
+    if len(_manifest_memo) > MANIFEST_MEMO_SIZE:
+        _manifest_memo.popitem(last=False)
+
+
+def recall_manifest(bucket, key, etag):
+    """Return a memoized manifest, or None if it hasn't been read in this process"""
+    manifest_data = _manifest_memo.get((bucket, key, etag))
+    if manifest_data is not None:
+        _manifest_memo.move_to_end((bucket, key, etag))
+    return manifest_data
+
+
+async def iter_docpack_manifests(s3_client, http_client, bucket=BUCKET_NAME, s3_select=False):
+    """List docpacks and read their manifests, yielding (object, manifest data) pairs
+
+    The manifest data is the raw manifest.json bytes, None if the docpack has
+    no manifest, or the exception raised while reading it; parsing is left to
+    the caller.
+
+    A producer walks the listing pages into a queue while a pool of workers
+    downloads manifests, so list and get round-trips overlap. Manifests already
+    read in this process, or whose ETag matches the on-disk cache, are not
+    downloaded at all. Pairs are yielded as soon as each manifest is ready, so
+    they arrive out of order.
+
+    With s3_select, sidecar manifests are queried with S3 Select and private
+    docpacks come back with None. The first query the store reports as
+    unsupported turns it off for the rest of the run.
+    """
+    cache = open_manifest_cache()
+    fresh_manifests = []
+
+    queue = asyncio.Queue(maxsize=MAX_CONCURRENCY * 2)
+    list_semaphore = asyncio.Semaphore(LIST_CONCURRENCY)
+    # Bounded, so a slow reader holds back the workers instead of piling up results
+    results = asyncio.Queue(maxsize=MAX_CONCURRENCY)
+    use_select = s3_select
+
+    async def enqueue_docpacks(page):
+        objects = page.get("Contents", [])
+        # A sidecar sorts right after its docpack, so it is almost always on the same page
+        sidecars = {obj["Key"]: obj for obj in objects if obj["Key"].endswith(SIDECAR_SUFFIX)}
+        docpacks = [obj for obj in objects if obj["Key"].endswith(".docpack")]
+        with cache:
+            cache.executemany("INSERT OR IGNORE INTO listed VALUES (?)", ((obj["Key"],) for obj in docpacks))
+        for obj in docpacks:
+            sidecar = sidecars.get(obj["Key"] + SIDECAR_SUFFIX)
+            # The archive's own manifest is authoritative; a sidecar older than its
+            # docpack predates a rewrite of the archive and may be stale
+            if sidecar and sidecar["LastModified"] < obj["LastModified"]:
+                sidecar = None
+            await queue.put((obj, sidecar))
+
+    async def list_prefix(prefix, **list_args):
+        """Enqueue every docpack under a prefix, returning its CommonPrefixes"""
+        async with list_semaphore:
+            paginator = s3_client.get_paginator("list_objects_v2")
+            pages = paginator.paginate(
+                Bucket=bucket,
+                Prefix=prefix,
+                PaginationConfig={"PageSize": LIST_PAGE_SIZE},
+                **list_args,
+            )
+            subprefixes = []
+            async for page in pages:
+                await enqueue_docpacks(page)
+                subprefixes.extend(common["Prefix"] for common in page.get("CommonPrefixes", []))
+            return subprefixes
+
+    async def produce():
+        # Probe the docpacks/ prefix; if it fits in one page that page is the whole listing
+        probe = await s3_client.list_objects_v2(Bucket=bucket, Prefix="docpacks/", MaxKeys=LIST_PAGE_SIZE)
+        if probe.get("IsTruncated"):
+            # Large bucket: shard the listing across the subdirectories of docpacks/
+            subprefixes = await list_prefix("docpacks/", Delimiter="/")
+            await asyncio.gather(*(list_prefix(prefix) for prefix in subprefixes))
+        else:
+            await enqueue_docpacks(probe)
+
+        # One sentinel per worker signals the end of the listing
+        for _ in range(MAX_CONCURRENCY):
+            await queue.put(None)
+
+    async def consume():
+        nonlocal use_select
+        while (item := await queue.get()) is not None:
+            obj, sidecar = item
+            key, etag = obj["Key"], obj["ETag"]
+            if sidecar:
+                # The sidecar can be rewritten on its own, so it is part of the cache key too
+                etag += sidecar["ETag"]
+
+            manifest_data = recall_manifest(bucket, key, etag)
+            if manifest_data is None:
+                manifest_data = load_cached_manifest(cache, bucket, key, etag)
+
+            if manifest_data is None:
+                try:
+                    if sidecar and use_select:
+                        manifest_data = await select_public_manifest(s3_client, bucket, key)
+                        if manifest_data is None:
+                            use_select = False
+                        elif not manifest_data:
+                            # Private; only whole manifests are cached, so this one is not
+                            await results.put((obj, None))
+                            continue
+                    if manifest_data is None:
+                        manifest_data = await extract_manifest_from_docpack(http_client, bucket, key, sidecar is not None)
+                except Exception as e:
+                    # One bad docpack is reported on its own rather than ending the listing
+                    await results.put((obj, e))
+                    continue
+                if manifest_data is not None:
+                    fresh_manifests.append(
+                        (bucket, key, etag, manifest_data, obj["LastModified"].isoformat())
+                    )
+                    if len(fresh_manifests) >= CACHE_BATCH_SIZE:
+                        store_manifests(cache, fresh_manifests)
+                        fresh_manifests.clear()
+
+            if manifest_data is not None:
+                remember_manifest(bucket, key, etag, manifest_data)
+            await results.put((obj, manifest_data))
+
+    async def run():
+        try:
+            await asyncio.gather(produce(), *(consume() for _ in range(MAX_CONCURRENCY)))
+        finally:
+            await results.put(None)
+
+    task = asyncio.create_task(run())
+    try:
+        while (result := await results.get()) is not None:
+            yield result
+        # Re-raise anything that failed in the producer or a worker
+        await task
+        # Only a listing that ran to completion says which docpacks are gone
+        prune_manifests(cache, bucket)
+    finally:
+        task.cancel()
+        # Keep what was fetched even if the run was interrupted
+        store_manifests(cache, fresh_manifests)
+        cache.close()
+
+
+async def fetch_docpack_manifests(s3_client, http_client, bucket=BUCKET_NAME, s3_select=False):
+    """Collect every (object, manifest data) pair from iter_docpack_manifests in listing order"""
+    results = [
+        result async for result in iter_docpack_manifests(s3_client, http_client, bucket, s3_select)
+    ]
+    # Workers finish out of order; S3 lists keys in sorted order anyway
+    results.sort(key=lambda result: result[0]["Key"])
+    return results
@@ -6,146 +6,161 @@ This demonstrates querying privacy information from the manifest itself rather t
 Usage:
     python3 scripts/list-public-docpacks.py
     python3 scripts/list-public-docpacks.py --json  # Output as JSON
+    python3 scripts/list-public-docpacks.py --columns  # Output as columnar JSON
+    python3 scripts/list-public-docpacks.py --s3-select  # Filter manifests server-side (S3 only)
 """
 
-import boto3
+import asyncio
 import sys
-import json
-import zipfile
-import io
+import orjson
 import argparse
-from pathlib import Path
-from botocore.config import Config
-from dotenv import load_dotenv
-import os
-
-# Load environment variables from website/.env
-env_path = Path(__file__).parent.parent / "website" / ".env"
-load_dotenv(env_path)
-
-# Get credentials from environment
-BUCKET_NAME = os.getenv("BUCKET_NAME", "doctown-central")
-ACCESS_KEY_ID = os.getenv("BUCKET_ACCESS_KEY_ID")
-SECRET_ACCESS_KEY = os.getenv("BUCKET_SECRET_ACCESS_KEY")
-ENDPOINT_URL = os.getenv("BUCKET_S3_ENDPOINT")
-
-if not all([ACCESS_KEY_ID, SECRET_ACCESS_KEY, ENDPOINT_URL]):
-    print("Error: Missing bucket credentials in website/.env", file=sys.stderr)
-    sys.exit(1)
-
-# Initialize S3 client
-s3_client = boto3.client(
-    "s3",
-    endpoint_url=ENDPOINT_URL,
-    aws_access_key_id=ACCESS_KEY_ID,
-    aws_secret_access_key=SECRET_ACCESS_KEY,
-    config=Config(signature_version="s3v4"),
-    region_name="auto",
+from docpack_listing import (
+    BUCKET_NAME,
+    ENDPOINT_URL,
+    check_credentials,
+    create_http_client,
+    create_s3_client,
+    fetch_docpack_manifests,
+    iter_docpack_manifests,
 )
 
 
-def extract_manifest_from_docpack(bucket, key):
-    """Download and extract manifest.json from a .docpack file"""
+def parse_manifest(key, manifest_data):
+    """Decode raw manifest.json bytes
+
+    Returns None, with a warning if something went wrong, when there is no
+    usable manifest.
+    """
+    if manifest_data is None:
+        return None
+    if isinstance(manifest_data, Exception):
+        print(f"Warning: Failed to extract manifest from {key}: {manifest_data}", file=sys.stderr)
+        return None
+
     try:
-        # Download the .docpack file
-        response = s3_client.get_object(Bucket=bucket, Key=key)
-        docpack_data = response["Body"].read()
-
-        # .docpack files are ZIP archives
-        with zipfile.ZipFile(io.BytesIO(docpack_data)) as zf:
-            # Look for manifest.json
-            if "manifest.json" in zf.namelist():
-                manifest_data = zf.read("manifest.json")
-                return json.loads(manifest_data)
-            else:
-                return None
-    except Exception as e:
-        print(f"Warning: Failed to extract manifest from {key}: {e}", file=sys.stderr)
+        return orjson.loads(manifest_data)
+    except orjson.JSONDecodeError as e:
+        print(f"Warning: Failed to parse manifest from {key}: {e}", file=sys.stderr)
         return None
 
 
-def list_public_docpacks(output_json=False):
+def public_docpack_record(obj, manifest):
+    """Build the JSON record for a public docpack"""
+    key = obj["Key"]
+    return {
+        "key": key,
+        "url": f"{ENDPOINT_URL}/{BUCKET_NAME}/{key}",
+        "size": obj["Size"],
+        "last_modified": obj["LastModified"],
+        "manifest": {
+            "project": manifest.get("project", {}),
+            "generated_at": manifest.get("generated_at"),
+            "language_summary": manifest.get("language_summary", {}),
+            "stats": manifest.get("stats", {}),
+            "public": True,
+        },
+    }
+
+
+async def stream_public_docpacks_json(s3_client, http_client, s3_select=False):
+    """Write public docpacks to stdout as a JSON array, one record per line, as they arrive"""
+    sys.stdout.write("[")
+    separator = "\n"
+    async for obj, manifest_data in iter_docpack_manifests(s3_client, http_client, s3_select=s3_select):
+        manifest = parse_manifest(obj["Key"], manifest_data)
+        if manifest is not None and manifest.get("public", False):
+            record = orjson.dumps(public_docpack_record(obj, manifest), option=orjson.OPT_NAIVE_UTC)
+            sys.stdout.write(separator + record.decode())
+            separator = ",\n"
+    sys.stdout.write("\n]\n")
+
+
+async def list_public_docpacks(output_json=False, output_columns=False, s3_select=False):
     """List all public docpacks by reading manifests directly from R2"""
 
-    if not output_json:
+    machine_output = output_json or output_columns
+    if not machine_output:
         print(f"\n🔍 Scanning R2 bucket for public docpacks: {BUCKET_NAME}\n", file=sys.stderr)
 
     try:
-        # List all objects in the docpacks/ prefix
-        paginator = s3_client.get_paginator("list_objects_v2")
-        pages = paginator.paginate(Bucket=BUCKET_NAME, Prefix="docpacks/")
-
-        public_docpacks = []
-        total_docpacks = 0
-
-        for page in pages:
-            if "Contents" not in page:
+        async with create_s3_client(s3_select) as s3_client, create_http_client() as http_client:
+            if output_json and not output_columns:
+                # Records are written as they arrive instead of being collected first
+                await stream_public_docpacks_json(s3_client, http_client, s3_select)
+                return
+            docpack_manifests = await fetch_docpack_manifests(s3_client, http_client, s3_select=s3_select)
+
+        total_docpacks = len(docpack_manifests)
+
+        # Public docpacks are stored column-wise, one list per field, rather than
+        # as a dict per docpack; only the manifest fields we report are kept
+        columns = {
+            "key": [],
+            "url": [],
+            "size": [],
+            "last_modified": [],
+            "project": [],
+            "generated_at": [],
+            "language_summary": [],
+            "stats": [],
+        }
+
+        for obj, manifest_data in docpack_manifests:
+            manifest = parse_manifest(obj["Key"], manifest_data)
+            if manifest is None:
                 continue
 
-            for obj in page["Contents"]:
+            # Check if the docpack is public
+            is_public = manifest.get("public", False)
+
+            if is_public:
                 key = obj["Key"]
-                if not key.endswith(".docpack"):
-                    continue
-
-                total_docpacks += 1
-
-                # Extract manifest to check public status
-                manifest = extract_manifest_from_docpack(BUCKET_NAME, key)
-
-                if manifest is None:
-                    continue
-
-                # Check if the docpack is public
-                is_public = manifest.get("public", False)
-
-                if is_public:
-                    public_docpack = {
-                        "key": key,
-                        "url": f"{ENDPOINT_URL}/{BUCKET_NAME}/{key}",
-                        "size": obj["Size"],
-                        "last_modified": obj["LastModified"].isoformat(),
-                        "manifest": {
-                            "project": manifest.get("project", {}),
-                            "generated_at": manifest.get("generated_at"),
-                            "language_summary": manifest.get("language_summary", {}),
-                            "stats": manifest.get("stats", {}),
-                            "public": True,
-                        },
-                    }
-                    public_docpacks.append(public_docpack)
-
-        if output_json:
-            # Output as JSON for programmatic consumption
-            print(json.dumps(public_docpacks, indent=2))
+                columns["key"].append(key)
+                columns["url"].append(f"{ENDPOINT_URL}/{BUCKET_NAME}/{key}")
+                columns["size"].append(obj["Size"])
+                columns["last_modified"].append(obj["LastModified"])
+                columns["project"].append(manifest.get("project", {}))
+                columns["generated_at"].append(manifest.get("generated_at"))
+                columns["language_summary"].append(manifest.get("language_summary", {}))
+                columns["stats"].append(manifest.get("stats", {}))
+
+        public_count = len(columns["key"])
+
+        if output_columns:
+            # Columnar JSON, ready for pandas.DataFrame(...) and friends
+            print(orjson.dumps(columns, option=orjson.OPT_INDENT_2 | orjson.OPT_NAIVE_UTC).decode())
         else:
             # Human-readable output
             print(f"📊 Statistics:", file=sys.stderr)
             print(f"   Total docpacks scanned: {total_docpacks}", file=sys.stderr)
-            print(f"   Public docpacks found:  {len(public_docpacks)}", file=sys.stderr)
+            print(f"   Public docpacks found:  {public_count}", file=sys.stderr)
             print("", file=sys.stderr)
 
-            if not public_docpacks:
+            if not public_count:
                 print("❌ No public docpacks found in bucket!", file=sys.stderr)
                 return
 
             print("=" * 80, file=sys.stderr)
 
-            for i, docpack in enumerate(public_docpacks, 1):
-                manifest = docpack["manifest"]
-                project = manifest.get("project", {})
-                stats = manifest.get("stats", {})
-
-                print(f"\n📦 Public Docpack {i}/{len(public_docpacks)}", file=sys.stderr)
-                print(f"   Project:      {project.get('name', 'N/A')}", file=sys.stderr)
-                print(f"   Version:      {project.get('version', 'N/A')}", file=sys.stderr)
-                print(f"   Repository:   {project.get('repo', 'N/A')}", file=sys.stderr)
-                print(f"   Commit:       {project.get('commit', 'N/A')}", file=sys.stderr)
-                print(f"   Generated:    {manifest.get('generated_at', 'N/A')}", file=sys.stderr)
-                print(f"   Symbols:      {stats.get('symbols_extracted', 0)}", file=sys.stderr)
-                print(f"   Docs:         {stats.get('docs_generated', 0)}", file=sys.stderr)
-                print(f"   Size:         {docpack['size']:,} bytes ({docpack['size'] / (1024*1024):.2f} MB)", file=sys.stderr)
-                print(f"   URL:          {docpack['url']}", file=sys.stderr)
-                print(f"   S3 Key:       {docpack['key']}", file=sys.stderr)
+            for i in range(public_count):
+                project = columns["project"][i]
+                stats = columns["stats"][i]
+                size = columns["size"][i]
+
+                # One write per docpack instead of one per line (stderr is unbuffered)
+                sys.stderr.write(
+                    f"\n📦 Public Docpack {i + 1}/{public_count}\n"
+                    f"   Project:      {project.get('name', 'N/A')}\n"
+                    f"   Version:      {project.get('version', 'N/A')}\n"
+                    f"   Repository:   {project.get('repo', 'N/A')}\n"
+                    f"   Commit:       {project.get('commit', 'N/A')}\n"
+                    f"   Generated:    {columns['generated_at'][i]}\n"
+                    f"   Symbols:      {stats.get('symbols_extracted', 0)}\n"
+                    f"   Docs:         {stats.get('docs_generated', 0)}\n"
+                    f"   Size:         {size:,} bytes ({size / (1024*1024):.2f} MB)\n"
+                    f"   URL:          {columns['url'][i]}\n"
+                    f"   S3 Key:       {columns['key'][i]}\n"
+                )
 
             print("\n" + "=" * 80, file=sys.stderr)
             print("\n✅ Done!\n", file=sys.stderr)
@@ -166,6 +181,26 @@ if __name__ == "__main__":
         action="store_true",
         help="Output results as JSON instead of human-readable format",
     )
+    parser.add_argument(
+        "--columns",
+        action="store_true",
+        help="Output results as columnar JSON (one array per field)",
+    )
+    parser.add_argument(
+        "--s3-select",
+        action="store_true",
+        help="Filter sidecar manifests server-side with S3 Select (not supported by R2)",
+    )
     args = parser.parse_args()
 
-    list_public_docpacks(output_json=args.json)
+    try:
+        check_credentials()
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    asyncio.run(
+        list_public_docpacks(
+            output_json=args.json, output_columns=args.columns, s3_select=args.s3_select
+        )
+    )